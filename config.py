@@ -35,7 +35,11 @@ DATA_CONFIG = {
     "hourly_data": "traffic-count.csv",
     "fifteen_min_data": "traffic-count-15min.csv",
     "date_format": "%Y-%m-%d",
-    "chunk_size": 10000
+    "csv_date_format": "%m/%d/%y",  # format of the Date column in the CSV files
+    "chunk_size": 10000,
+    "cache_suffix": ".parquet",  # standardized copy stored next to each CSV
+    "cache_compression": "zstd",
+    "cache_version": 8  # bump whenever the cached frame's layout or types change
 }
 
 # Column mappings for standardization
@@ -78,6 +82,32 @@ COLUMN_MAPPINGS = {
     'URL': 'URL'
 }
 
+# COLUMN_MAPPINGS keyed by normalized name (lower case, hyphens as spaces)
+NORMALIZED_COLUMN_MAPPINGS = {
+    original.lower().replace('-', ' ').strip(): mapped
+    for original, mapped in COLUMN_MAPPINGS.items()
+}
+
+# Column types of the loaded frame; low-cardinality labels are stored as
+# categories and vehicle counts as int32, with blank counts read as zero
+COLUMN_DTYPES = {
+    'ID': 'category',
+    'Project ID': 'category',
+    'Name': 'category',
+    'Time Interval': 'category',
+    'Direction ID': 'category',
+    'Car': 'int32',
+    'Microbus': 'int32',
+    'Bus': 'int32',
+    'Truck': 'int32',
+    'Special vehicular': 'int32',
+    'Motorcycle': 'int32',
+    'Bicycle': 'int32',
+    'Total Vehicles': 'int32',
+    'LONG': 'float32',
+    'LAT': 'float32'
+}
+
 # Required columns for data validation
 REQUIRED_COLUMNS = {
     'Project ID', 
@@ -89,4 +119,18 @@ REQUIRED_COLUMNS = {
     'Name', 
     'LONG', 
     'LAT'
-}
\ No newline at end of file
+}
+
+# Vehicle composition columns, in display order
+VEHICLE_COLUMNS = [
+    'Car',
+    'Microbus',
+    'Bus',
+    'Truck',
+    'Special vehicular',
+    'Motorcycle',
+    'Bicycle'
+]
+
+# Columns the dashboard uses; everything else is skipped at load time
+LOADED_COLUMNS = REQUIRED_COLUMNS | set(VEHICLE_COLUMNS)
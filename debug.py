@@ -1,6 +1,8 @@
 import pandas as pd
+import numpy as np
 import logging
-from config import DATA_CONFIG
+from concurrent.futures import ThreadPoolExecutor
+from config import DATA_CONFIG, VEHICLE_COLUMNS
 from utils import standardize_column_names
 
 # Set up logging
@@ -10,148 +12,227 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def analyze_data_structure():
+def coerce_column(chunk, column, parse, parse_errors):
+    """
+    Parse a raw column, counting values that are present but unparseable
+    """
+    values = parse(chunk[column])
+    failed = int((values.isna() & chunk[column].notna()).sum())
+    if failed:
+        parse_errors[column] = parse_errors.get(column, 0) + failed
+    return values
+
+def scan_stats(path):
+    """
+    Scan a CSV file chunk by chunk, folding everything the debug checks
+    need into running aggregates so memory stays bounded by the chunk size.
+    Columns are read as pandas infers them, so malformed values are
+    counted and reported instead of stopping the scan.
+    """
+    stats = {
+        'columns': None,
+        'standardized_columns': None,
+        'time_interval_sample': None,
+        'dtypes': None,
+        'ids': pd.Index([]),
+        'date_min': None,
+        'date_max': None,
+        'lat_min': None,
+        'lat_max': None,
+        'long_min': None,
+        'long_max': None,
+        'null_counts': None,
+        'parse_errors': {},
+        'dup_count': 0,
+        'invalid_coord_rows': None
+    }
+    bounds = {'date': [], 'lat': [], 'long': []}
+    row_hashes = []
+    invalid_chunks = []
+    to_number = lambda values: pd.to_numeric(values, errors='coerce')
+
+    for chunk in pd.read_csv(path, chunksize=DATA_CONFIG['chunk_size']):
+        if stats['columns'] is None:
+            stats['columns'] = chunk.columns.tolist()
+        chunk = standardize_column_names(chunk)
+        if stats['standardized_columns'] is None:
+            stats['standardized_columns'] = chunk.columns.tolist()
+            if 'Time Interval' in chunk.columns:
+                stats['time_interval_sample'] = chunk['Time Interval'].head()
+
+        # Types are inferred per chunk; a column inferred differently across
+        # chunks holds mixed values and is reported as object
+        stats['dtypes'] = (chunk.dtypes if stats['dtypes'] is None
+                           else stats['dtypes'].where(stats['dtypes'] == chunk.dtypes, np.dtype(object)))
+
+        if 'ID' in chunk.columns:
+            stats['ids'] = stats['ids'].union(pd.Index(chunk['ID'].dropna().unique()))
+
+        if 'Date' in chunk.columns:
+            dates = coerce_column(
+                chunk, 'Date',
+                lambda values: pd.to_datetime(values, format=DATA_CONFIG['csv_date_format'], errors='coerce'),
+                stats['parse_errors']
+            )
+            bounds['date'] += [dates.min(), dates.max()]
+
+        for col in VEHICLE_COLUMNS + ['Total Vehicles']:
+            if col in chunk.columns:
+                coerce_column(chunk, col, to_number, stats['parse_errors'])
+
+        null_counts = chunk.isnull().sum()
+        stats['null_counts'] = (null_counts if stats['null_counts'] is None
+                                else stats['null_counts'].add(null_counts, fill_value=0))
+
+        # Rows are kept as 64-bit hashes so duplicates are found across chunks;
+        # numbers are hashed as float64 so a column inferred as int in one
+        # chunk and float in another still matches
+        numeric_columns = chunk.select_dtypes('number').columns
+        row_hashes.append(pd.util.hash_pandas_object(
+            chunk.astype(dict.fromkeys(numeric_columns, 'float64')), index=False
+        ).to_numpy())
+
+        if 'LAT' in chunk.columns and 'LONG' in chunk.columns:
+            lat = coerce_column(chunk, 'LAT', to_number, stats['parse_errors'])
+            lon = coerce_column(chunk, 'LONG', to_number, stats['parse_errors'])
+            bounds['lat'] += [lat.min(), lat.max()]
+            bounds['long'] += [lon.min(), lon.max()]
+
+            # NaN fails every comparison, so one range test also flags
+            # missing and unparseable values
+            invalid = ~((np.abs(lat.to_numpy()) <= 90) & (np.abs(lon.to_numpy()) <= 180))
+            if invalid.any():
+                columns = [col for col in ['ID', 'LAT', 'LONG'] if col in chunk.columns]
+                invalid_chunks.append(chunk.loc[invalid, columns])
+
+    if row_hashes:
+        stats['dup_count'] = int(pd.Series(np.concatenate(row_hashes)).duplicated().sum())
+    for name, values in bounds.items():
+        if values:
+            values = pd.Series(values)
+            stats[f'{name}_min'] = values.min()
+            stats[f'{name}_max'] = values.max()
+    if invalid_chunks:
+        stats['invalid_coord_rows'] = pd.concat(invalid_chunks, ignore_index=True)
+    return stats
+
+def format_ids(ids, limit=20):
+    """Format location IDs for logging, summarizing long lists"""
+    if len(ids) <= limit:
+        return ids.tolist()
+    return f"{len(ids)} locations, e.g. {ids[:limit].tolist()}"
+
+def scanned_datasets(hourly_stats, fifteen_min_stats):
+    """Pair each successfully scanned dataset with its label"""
+    return [
+        (label, stats)
+        for label, stats in (("Hourly", hourly_stats), ("15-min", fifteen_min_stats))
+        if stats is not None
+    ]
+
+def analyze_data_structure(hourly_stats, fifteen_min_stats):
     """Analyze and print data structure information for debugging"""
-    
-    # Check hourly data
-    logger.info("Analyzing hourly data structure...")
-    try:
-        df_hourly = pd.read_csv(DATA_CONFIG['hourly_data'])
-        logger.info("Original hourly data columns:")
-        logger.info(df_hourly.columns.tolist())
-        
-        df_hourly = standardize_column_names(df_hourly)
-        logger.info("Standardized hourly data columns:")
-        logger.info(df_hourly.columns.tolist())
-        
-        if 'Time Interval' in df_hourly.columns:
-            logger.info("Sample Time Intervals (hourly):")
-            logger.info(df_hourly['Time Interval'].head())
-        else:
-            logger.error("Time Interval column not found in hourly data")
-            
-    except Exception as e:
-        logger.error(f"Error processing hourly data: {str(e)}")
+    for label, stats in scanned_datasets(hourly_stats, fifteen_min_stats):
+        logger.info(f"\nAnalyzing {label} data structure...")
+        try:
+            logger.info(f"Original {label} data columns:")
+            logger.info(stats['columns'])
+            logger.info(f"Standardized {label} data columns:")
+            logger.info(stats['standardized_columns'])
 
-    # Check 15-min data
-    logger.info("\nAnalyzing 15-minute data structure...")
-    try:
-        df_15min = pd.read_csv(DATA_CONFIG['fifteen_min_data'])
-        logger.info("Original 15-minute data columns:")
-        logger.info(df_15min.columns.tolist())
-        
-        df_15min = standardize_column_names(df_15min)
-        logger.info("Standardized 15-minute data columns:")
-        logger.info(df_15min.columns.tolist())
-        
-        if 'Time Interval' in df_15min.columns:
-            logger.info("Sample Time Intervals (15-min):")
-            logger.info(df_15min['Time Interval'].head())
-        else:
-            logger.error("Time Interval column not found in 15-minute data")
-            
-    except Exception as e:
-        logger.error(f"Error processing 15-minute data: {str(e)}")
+            if stats['time_interval_sample'] is not None:
+                logger.info(f"Sample Time Intervals ({label}):")
+                logger.info(stats['time_interval_sample'])
+            else:
+                logger.error(f"Time Interval column not found in {label} data")
 
-def check_data_consistency():
+        except Exception as e:
+            logger.error(f"Error processing {label} data: {str(e)}")
+
+def check_data_consistency(hourly_stats, fifteen_min_stats):
     """Check data consistency and relationships"""
+    datasets = scanned_datasets(hourly_stats, fifteen_min_stats)
     try:
-        # Load both datasets
-        df_hourly = pd.read_csv(DATA_CONFIG['hourly_data'])
-        df_15min = pd.read_csv(DATA_CONFIG['fifteen_min_data'])
-        
         # Check location IDs
-        hourly_locations = set(df_hourly['ID'].unique())
-        fifteen_min_locations = set(df_15min['ID'].unique())
-        
         logger.info("Location ID Analysis:")
-        logger.info(f"Hourly data locations: {hourly_locations}")
-        logger.info(f"15-min data locations: {fifteen_min_locations}")
-        logger.info(f"Common locations: {hourly_locations & fifteen_min_locations}")
-        logger.info(f"Locations only in hourly: {hourly_locations - fifteen_min_locations}")
-        logger.info(f"Locations only in 15-min: {fifteen_min_locations - hourly_locations}")
-        
+        for label, stats in datasets:
+            logger.info(f"{label} data locations: {format_ids(stats['ids'])}")
+        if len(datasets) == 2:
+            hourly_locations = hourly_stats['ids']
+            fifteen_min_locations = fifteen_min_stats['ids']
+            logger.info(f"Common locations: {format_ids(hourly_locations.intersection(fifteen_min_locations))}")
+            logger.info(f"Locations only in hourly: {format_ids(hourly_locations.difference(fifteen_min_locations))}")
+            logger.info(f"Locations only in 15-min: {format_ids(fifteen_min_locations.difference(hourly_locations))}")
+
         # Check date ranges
         logger.info("\nDate Range Analysis:")
-        hourly_dates = pd.to_datetime(df_hourly['Date']).dt.date
-        fifteen_min_dates = pd.to_datetime(df_15min['Date']).dt.date
-        
-        logger.info(f"Hourly data date range: {hourly_dates.min()} to {hourly_dates.max()}")
-        logger.info(f"15-min data date range: {fifteen_min_dates.min()} to {fifteen_min_dates.max()}")
-        
+        for label, stats in datasets:
+            if stats['date_min'] is not None:
+                logger.info(f"{label} data date range: {stats['date_min'].date()} to {stats['date_max'].date()}")
+            else:
+                logger.error(f"Date column not found in {label} data")
+
         # Check for missing values
         logger.info("\nMissing Value Analysis:")
-        logger.info("Hourly data missing values:")
-        logger.info(df_hourly.isnull().sum())
-        logger.info("\n15-min data missing values:")
-        logger.info(df_15min.isnull().sum())
-        
+        for label, stats in datasets:
+            logger.info(f"{label} data missing values:")
+            logger.info(stats['null_counts'])
+
+        # Check for values that do not parse as their column's type
+        logger.info("\nUnparseable Value Analysis:")
+        for label, stats in datasets:
+            logger.info(f"{label} data unparseable values: {stats['parse_errors']}")
+
         # Check data types
         logger.info("\nData Type Analysis:")
-        logger.info("Hourly data types:")
-        logger.info(df_hourly.dtypes)
-        logger.info("\n15-min data types:")
-        logger.info(df_15min.dtypes)
-        
+        for label, stats in datasets:
+            logger.info(f"{label} data types:")
+            logger.info(stats['dtypes'])
+
         # Check for duplicate records
         logger.info("\nDuplicate Record Analysis:")
-        hourly_dupes = df_hourly.duplicated().sum()
-        fifteen_min_dupes = df_15min.duplicated().sum()
-        logger.info(f"Hourly data duplicates: {hourly_dupes}")
-        logger.info(f"15-min data duplicates: {fifteen_min_dupes}")
-        
+        for label, stats in datasets:
+            logger.info(f"{label} data duplicates: {stats['dup_count']}")
+
     except Exception as e:
         logger.error(f"Error checking data consistency: {str(e)}")
 
-def validate_coordinates():
+def validate_coordinates(hourly_stats, fifteen_min_stats):
     """Validate geographic coordinates"""
     try:
-        # Load both datasets
-        df_hourly = pd.read_csv(DATA_CONFIG['hourly_data'])
-        df_15min = pd.read_csv(DATA_CONFIG['fifteen_min_data'])
-        
         # Check coordinate ranges
         logger.info("Coordinate Validation:")
-        
-        # Hourly data
-        logger.info("\nHourly Data Coordinates:")
-        logger.info(f"LAT range: {df_hourly['LAT'].min()} to {df_hourly['LAT'].max()}")
-        logger.info(f"LONG range: {df_hourly['LONG'].min()} to {df_hourly['LONG'].max()}")
-        invalid_coords = df_hourly[
-            (df_hourly['LAT'].isna()) | 
-            (df_hourly['LONG'].isna()) |
-            (df_hourly['LAT'] < -90) | 
-            (df_hourly['LAT'] > 90) |
-            (df_hourly['LONG'] < -180) | 
-            (df_hourly['LONG'] > 180)
-        ]
-        if not invalid_coords.empty:
-            logger.error("Invalid coordinates found in hourly data:")
-            logger.error(invalid_coords[['ID', 'LAT', 'LONG']])
-        
-        # 15-min data
-        logger.info("\n15-min Data Coordinates:")
-        logger.info(f"LAT range: {df_15min['LAT'].min()} to {df_15min['LAT'].max()}")
-        logger.info(f"LONG range: {df_15min['LONG'].min()} to {df_15min['LONG'].max()}")
-        invalid_coords = df_15min[
-            (df_15min['LAT'].isna()) | 
-            (df_15min['LONG'].isna()) |
-            (df_15min['LAT'] < -90) | 
-            (df_15min['LAT'] > 90) |
-            (df_15min['LONG'] < -180) | 
-            (df_15min['LONG'] > 180)
-        ]
-        if not invalid_coords.empty:
-            logger.error("Invalid coordinates found in 15-min data:")
-            logger.error(invalid_coords[['ID', 'LAT', 'LONG']])
-            
+
+        for label, stats in scanned_datasets(hourly_stats, fifteen_min_stats):
+            logger.info(f"\n{label} Data Coordinates:")
+            logger.info(f"LAT range: {stats['lat_min']} to {stats['lat_max']}")
+            logger.info(f"LONG range: {stats['long_min']} to {stats['long_max']}")
+            if stats['invalid_coord_rows'] is not None:
+                logger.error(f"Invalid coordinates found in {label} data:")
+                logger.error(stats['invalid_coord_rows'])
+
     except Exception as e:
         logger.error(f"Error validating coordinates: {str(e)}")
 
+def scan_file(path):
+    """Scan one data file, logging the error and returning None if it fails"""
+    try:
+        return scan_stats(path)
+    except Exception as e:
+        logger.error(f"Error scanning {path}: {str(e)}")
+        return None
+
 if __name__ == "__main__":
     print("Starting data validation and debugging...")
-    analyze_data_structure()
-    check_data_consistency()
-    validate_coordinates()
+    # The files are independent, so overlap their reads; pandas releases
+    # the GIL while parsing. Each file is scanned on its own, so a missing
+    # or unreadable file does not hide the report for the other
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hourly_future = executor.submit(scan_file, DATA_CONFIG['hourly_data'])
+        fifteen_min_future = executor.submit(scan_file, DATA_CONFIG['fifteen_min_data'])
+        hourly_stats = hourly_future.result()
+        fifteen_min_stats = fifteen_min_future.result()
+    analyze_data_structure(hourly_stats, fifteen_min_stats)
+    check_data_consistency(hourly_stats, fifteen_min_stats)
+    validate_coordinates(hourly_stats, fifteen_min_stats)
     print("Data validation and debugging complete.")
-
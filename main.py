@@ -2,18 +2,21 @@ import streamlit as st
 import pandas as pd
 import logging
 import os
-import base64
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from streamlit_folium import st_folium
 from config import PAGE_CONFIG, APP_CONFIG, DATA_CONFIG
-from utils import load_data, calculate_intersection_stats
-from map_utils import create_map
+from utils import load_data, get_file_stamp, calculate_intersection_stats
+from map_utils import draw_base_map, prepare_map_data, create_selection_layer
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sidebar option that disables project filtering
+ALL_PROJECTS = "All Projects"
+
 # Must be the first Streamlit command
 st.set_page_config(
     **PAGE_CONFIG,
@@ -43,57 +46,184 @@ def load_css():
     except Exception as e:
         logger.error(f"Error loading CSS: {str(e)}")
 
-@st.cache_data(show_spinner=True)
-def load_dataset(data_type):
-    """Load and validate dataset based on selected interval"""
+def get_data_path(data_type):
+    """Return the CSV file backing the selected data interval"""
+    if data_type == "15 Minutes":
+        return DATA_CONFIG['fifteen_min_data']
+    return DATA_CONFIG['hourly_data']
+
+@st.cache_resource(max_entries=4, show_spinner=True)
+def load_dataset(data_path, file_stamp):
+    """Load and validate the dataset for one version of a data file"""
     try:
-        if data_type == "15 Minutes":
-            df = load_data(DATA_CONFIG['fifteen_min_data'])
-        else:
-            df = load_data(DATA_CONFIG['hourly_data'])
+        df = load_data(data_path)
         
         if df is None or df.empty:
             raise ValueError("No data loaded")
             
-        # Ensure Date column is properly formatted
-        df['Date'] = pd.to_datetime(df['Date']).dt.date
-            
         return df
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         st.stop()
 
-@st.cache_data
-def load_and_encode_image(image_path):
-    """Cache image loading and encoding"""
+@st.cache_data(max_entries=4)
+def build_filter_index(data_path, file_stamp):
+    """Precompute the sidebar options for every project and date"""
+    df = load_dataset(data_path, file_stamp)
+    index = {
+        'projects': sorted(df['Project ID'].unique().tolist()),
+        'dates': {},
+        'intervals': {},
+        'locations': {}
+    }
+    scopes = [(ALL_PROJECTS, df)] + list(df.groupby('Project ID', observed=True))
+    for project, project_df in scopes:
+        index['dates'][project] = project_df['Date'].drop_duplicates().sort_values().tolist()
+        index['locations'][project] = sorted(project_df['ID'].unique())
+        for date, date_df in project_df.groupby('Date'):
+            index['intervals'][(project, date)] = sorted(date_df['Time Interval'].unique())
+    return index
+
+@st.cache_resource(max_entries=4)
+def build_direction_table(data_path, file_stamp):
+    """Index per-direction volumes by location, date and time interval"""
+    df = load_dataset(data_path, file_stamp)
+    return df.set_index(['ID', 'Date', 'Time Interval'])[
+        ['Project ID', 'Direction ID', 'Total Vehicles']
+    ].sort_index()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_map_data(data_path, file_stamp, time_interval, selected_date, project_id):
+    """Prepare the traffic map markers for a date, interval and project"""
+    df = load_dataset(data_path, file_stamp)
+    return prepare_map_data(df, time_interval, selected_date, project_id)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def compute_view(data_path, file_stamp, project_id, selected_date, time_interval, selected_location):
+    """Compute the statistics and per-direction volumes for one selection"""
+    df = load_dataset(data_path, file_stamp)
+    stats = calculate_intersection_stats(df, selected_location, time_interval, project_id)
+    
+    direction_table = build_direction_table(data_path, file_stamp)
     try:
-        if os.path.exists(image_path):
-            with open(image_path, "rb") as f:
-                image_bytes = f.read()
-                return base64.b64encode(image_bytes).decode()
-        return None
-    except Exception as e:
-        logger.error(f"Error loading image: {str(e)}")
-        return None
+        direction_data = direction_table.loc[[(selected_location, selected_date, time_interval)]]
+    except KeyError:
+        direction_data = direction_table.iloc[0:0]
+    if project_id:
+        direction_data = direction_data[direction_data['Project ID'] == project_id]
+    directions = direction_data.sort_values('Direction ID').set_index('Direction ID')['Total Vehicles']
+    
+    return {'stats': stats, 'directions': directions}
+
+@lru_cache(maxsize=128)
+def read_image_bytes(image_path, mtime_ns):
+    """Read an image file, cached per file version"""
+    with open(image_path, "rb") as f:
+        return f.read()
 
 def display_intersection_image(stats, selected_location):
-    """Handle intersection image display with caching"""
+    """Show the intersection layout image served by Streamlit's media handler"""
     if not stats.get('image_url'):
         return
         
     image_path = stats['image_url']
-    encoded_image = load_and_encode_image(image_path)
-    
-    if encoded_image:
-        st.markdown(f"""
-            <div style="width: 100%; max-width: 800px; margin: 0 auto;">
-                <img src="data:image/png;base64,{encoded_image}" 
-                    alt="Intersection layout"
-                    style="width: 100%; height: auto; border-radius: 8px;">
-            </div>
-        """, unsafe_allow_html=True)
-    else:
+    try:
+        image_bytes = read_image_bytes(image_path, os.stat(image_path).st_mtime_ns)
+    except OSError as e:
+        logger.error(f"Error loading image: {str(e)}")
         st.error(f"Image not found for Location {selected_location}")
+        return
+    
+    st.image(image_bytes, use_container_width=True)
+
+def report_app_error(e):
+    """Log an unexpected error and show it to the user"""
+    logger.error(f"Application error: {str(e)}")
+    st.error("An unexpected error occurred. Please try again or contact support.")
+    if st.checkbox("Show error details"):
+        st.exception(e)
+
+@st.fragment
+def render_main_content(data_path, file_stamp, selected_project, selected_date,
+                        time_interval, selected_location):
+    """Render the map, statistics, layout image and direction chart"""
+    try:
+        project_id = selected_project if selected_project != ALL_PROJECTS else None
+        
+        # First row: Map and Statistics side by side
+        col1, col2 = st.columns([2, 1])  # 2:1 ratio for map to stats
+
+        with col1:
+            st.subheader("🗺️ Traffic Volume Map")
+            with st.spinner('Creating map...'):
+                map_data = build_map_data(
+                    data_path,
+                    file_stamp,
+                    time_interval, 
+                    selected_date, 
+                    project_id
+                )
+                
+                # A new map per rerun: st_folium attaches the selection layer
+                # to the map it is given, so a shared map object would keep it
+                m = draw_base_map(map_data) if map_data is not None else None
+                if m is not None:
+                    st_folium(
+                        m,
+                        width=800,
+                        height=600,
+                        feature_group_to_add=create_selection_layer(map_data['summary'], selected_location)
+                    )
+                else:
+                    st.warning("Unable to create map with current selection")
+
+        with col2:
+            st.subheader("📊 Traffic Statistics")
+            with st.spinner('Loading statistics...'):
+                view = compute_view(
+                    data_path,
+                    file_stamp,
+                    project_id,
+                    selected_date,
+                    time_interval,
+                    selected_location
+                )
+                stats = view['stats']
+            
+            # Display total vehicles
+            st.metric("Total Vehicles", f"{int(stats['total_vehicles']):,}")
+            
+            # Vehicle composition
+            if stats.get('percentages'):
+                st.write("#### 🚗 Vehicle Composition")
+                for vehicle_type, percentage in stats['percentages'].items():
+                    if percentage > 0:
+                        st.text(f"{vehicle_type}: {percentage:.1f}% ({stats['vehicle_composition'][vehicle_type]:,})")
+                        st.progress(percentage/100)
+                        
+            else:
+                st.info("No vehicle composition data available")
+
+        # Second row: Intersection Image (full width)
+        if stats.get('image_url'):
+            st.subheader("📸 Intersection Layout")
+            display_intersection_image(stats, selected_location)
+
+        # Third row: Peak Flow Analysis (full width)
+        st.subheader("🔄 Peak Hour: Volumes Per Direction")
+        direction_volumes = view['directions']
+
+        if not direction_volumes.empty:
+            st.bar_chart(
+                direction_volumes,
+                use_container_width=True,
+                height=400
+            )
+        else:
+            st.warning("No direction data available for the selected filters")
+
+    except Exception as e:
+        report_app_error(e)
 
 def main():
     """Main application function"""
@@ -119,7 +249,13 @@ def main():
             
             # Load appropriate dataset with loading indicator
             with st.spinner('Loading data...'):
-                df = load_dataset(data_type)
+                data_path = get_data_path(data_type)
+                try:
+                    file_stamp = get_file_stamp(data_path)
+                except OSError as e:
+                    st.error(f"Error loading data: {str(e)}")
+                    return
+                df = load_dataset(data_path, file_stamp)
             
             if df is None or df.empty:
                 st.error("No data available. Please check the data files.")
@@ -127,7 +263,8 @@ def main():
 
             # Project selection
             try:
-                all_projects = ["All Projects"] + sorted(df['Project ID'].unique().tolist())
+                filter_index = build_filter_index(data_path, file_stamp)
+                all_projects = [ALL_PROJECTS] + filter_index['projects']
                 selected_project = st.selectbox(
                     "🏗️ Select Project",
                     options=all_projects,
@@ -138,17 +275,13 @@ def main():
                 st.write("Available columns:", df.columns.tolist())
                 return
 
-            # Filter data if project is selected
-            if selected_project != "All Projects":
-                df = df[df['Project ID'] == selected_project]
-
             # Date filter
             try:
-                unique_dates = sorted(df['Date'].unique())
+                unique_dates = filter_index['dates'][selected_project]
                 selected_date = st.selectbox(
                     "📅 Select Date",
                     options=unique_dates,
-                    format_func=lambda d: d.strftime(DATA_CONFIG['date_format'])
+                    format_func=lambda d: pd.Timestamp(d).strftime(DATA_CONFIG['date_format'])
                 )
             except Exception as e:
                 st.error(f"Error processing dates: {str(e)}")
@@ -156,9 +289,7 @@ def main():
             
             # Time interval selection
             try:
-                valid_time_intervals = sorted(
-                    df[df['Date'] == selected_date]['Time Interval'].unique()
-                )
+                valid_time_intervals = filter_index['intervals'][(selected_project, selected_date)]
                 time_interval = st.selectbox(
                     "🕒 Select Time Interval",
                     options=valid_time_intervals
@@ -169,7 +300,7 @@ def main():
             
             # Location selection
             try:
-                valid_locations = sorted(df['ID'].unique())
+                valid_locations = filter_index['locations'][selected_project]
                 selected_location = st.selectbox(
                     "📍 Select Location",
                     options=valid_locations,
@@ -182,77 +313,17 @@ def main():
         # ----------------------------------------
         # MAIN CONTENT AREA
         # ----------------------------------------
-        
-        # First row: Map and Statistics side by side
-        col1, col2 = st.columns([2, 1])  # 2:1 ratio for map to stats
-
-        with col1:
-            st.subheader("🗺️ Traffic Volume Map")
-            with st.spinner('Creating map...'):
-                m = create_map(
-                    df, 
-                    time_interval, 
-                    selected_date, 
-                    selected_location,
-                    selected_project if selected_project != "All Projects" else None
-                )
-                
-                if m is not None:
-                    st_folium(m, width=800, height=600)
-                else:
-                    st.warning("Unable to create map with current selection")
-
-        with col2:
-            st.subheader("📊 Traffic Statistics")
-            with st.spinner('Loading statistics...'):
-                stats = calculate_intersection_stats(
-                    df, 
-                    selected_location, 
-                    time_interval,
-                    selected_project if selected_project != "All Projects" else None
-                )
-            
-            # Display total vehicles
-            st.metric("Total Vehicles", f"{int(stats['total_vehicles']):,}")
-            
-            # Vehicle composition
-            if stats.get('percentages'):
-                st.write("#### 🚗 Vehicle Composition")
-                for vehicle_type, percentage in stats['percentages'].items():
-                    if percentage > 0:
-                        st.text(f"{vehicle_type}: {percentage:.1f}% ({stats['vehicle_composition'][vehicle_type]:,})")
-                        st.progress(percentage/100)
-                        
-            else:
-                st.info("No vehicle composition data available")
-
-        # Second row: Intersection Image (full width)
-        if stats.get('image_url'):
-            st.subheader("📸 Intersection Layout")
-            display_intersection_image(stats, selected_location)
-
-        # Third row: Peak Flow Analysis (full width)
-        st.subheader("🔄 Peak Hour: Volumes Per Direction")
-        direction_data = df[
-            (df['ID'] == selected_location) & 
-            (df['Time Interval'] == time_interval) &
-            (df['Date'] == selected_date)
-        ].sort_values('Direction ID')
-
-        if not direction_data.empty:
-            st.bar_chart(
-                direction_data.set_index('Direction ID')['Total Vehicles'],
-                use_container_width=True,
-                height=400
-            )
-        else:
-            st.warning("No direction data available for the selected filters")
+        render_main_content(
+            data_path,
+            file_stamp,
+            selected_project,
+            selected_date,
+            time_interval,
+            selected_location
+        )
 
     except Exception as e:
-        logger.error(f"Application error: {str(e)}")
-        st.error("An unexpected error occurred. Please try again or contact support.")
-        if st.checkbox("Show error details"):
-            st.exception(e)
+        report_app_error(e)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
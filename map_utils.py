@@ -4,56 +4,82 @@ import pandas as pd
 from datetime import datetime
 import logging
 from config import MAP_CONFIG, DATA_CONFIG
+from utils import get_location_meta, get_rows
 
 logger = logging.getLogger(__name__)
 
+# Marker HTML, filled in per location. The vehicle count is drawn inside
+# the circle, which CircleMarker cannot do, so markers stay DivIcons
+MARKER_ICON_HTML = (
+    '<div style="width: {diameter}px; height: {diameter}px; '
+    'background-color: {color}; border-radius: 50%; opacity: 0.7; '
+    'display: flex; align-items: center; justify-content: center; '
+    'color: #fff; font-weight: bold; font-size: {font_size}px; '
+    'border: 2px solid transparent;">{label}</div>'
+)
+MARKER_OUTLINE_HTML = (
+    '<div style="width: {diameter}px; height: {diameter}px; '
+    'border-radius: 50%; border: 2px solid #000;"></div>'
+)
+MARKER_POPUP_HTML = (
+    "<div style='width: 220px;'>"
+    '<h4 style="margin:5px 0;">{name}</h4>'
+    '<b>Total Vehicles:</b> {total:,}<br>'
+    '<b>Time:</b> {time_interval}<br>'
+    '<b>Volume/Capacity (v/c):</b> {v_c_ratio:.2f}'
+    '</div>'
+)
+
 def create_color_marker(total_vehicles, capacity=MAP_CONFIG['capacity_assumption']):
     """
     Determine marker color based on volume/capacity ratio
     
     Args:
-        total_vehicles (int): Total vehicle count
+        total_vehicles (int or np.ndarray): Total vehicle count(s)
         capacity (int): Assumed capacity
         
     Returns:
-        str: Color code for marker
+        str or np.ndarray: Color code(s) for marker(s)
     """
-    v_c_ratio = total_vehicles / capacity
-    if v_c_ratio < 0.6:
-        return 'green'
-    elif v_c_ratio < 0.8:
-        return 'orange'
-    else:
-        return 'red'
+    v_c_ratio = np.asarray(total_vehicles) / capacity
+    colors = np.select(
+        [v_c_ratio < 0.6, v_c_ratio < 0.8],
+        ['green', 'orange'],
+        default='red'
+    )
+    return colors if colors.ndim else str(colors)
 
-def create_map(data, time_interval, selected_date, selected_location=None, project_id=None):
+def get_marker_size(total_vehicles):
+    """Scale marker radius logarithmically with traffic volume"""
+    return np.log(np.asarray(total_vehicles, dtype=float) + 1) * 3
+
+def prepare_map_data(data, time_interval, selected_date, project_id=None):
     """
-    Create an interactive map with traffic volume markers
+    Compute the map center, marker features and per-location summary for
+    a date, interval and project, or None when nothing matches. The result
+    is plain data, so it can be cached and drawn onto a fresh map each time.
     """
     try:
-        # Convert selected_date to date object if it's string
+        # Convert selected_date to a Timestamp to match the datetime64 Date column
         if isinstance(selected_date, str):
-            selected_date = datetime.strptime(selected_date, DATA_CONFIG['date_format']).date()
+            selected_date = datetime.strptime(selected_date, DATA_CONFIG['date_format'])
+        selected_date = pd.Timestamp(selected_date)
         
         # Filter data
-        filters = [
-            (data['Date'] == selected_date),
-            (data['Time Interval'] == time_interval)
-        ]
+        filters = {'Date': selected_date, 'Time Interval': time_interval}
         
         if project_id:
-            filters.append(data['Project ID'] == project_id)
+            filters['Project ID'] = project_id
             
-        filtered_data = data[np.all(filters, axis=0)]
+        filtered_data = get_rows(data, filters)
         
         if filtered_data.empty:
             logger.warning("No data available for selected filters")
             return None
         
-        # Group by location
-        location_summary = filtered_data.groupby(
-            ['ID', 'Name', 'LONG', 'LAT', 'Direct_Image_URL']
-        )['Total Vehicles'].sum().reset_index()
+        # Sum by location ID, then attach the per-location name and coordinates
+        totals = filtered_data.groupby('ID', observed=True)['Total Vehicles'].sum()
+        location_summary = get_location_meta(data).join(totals, how='right').reset_index()
         
         # Handle invalid coordinates
         mean_lat = location_summary['LAT'].mean()
@@ -64,62 +90,148 @@ def create_map(data, time_interval, selected_date, selected_location=None, proje
             mean_lat = MAP_CONFIG['default_lat']
             mean_long = MAP_CONFIG['default_long']
         
-        # Create map
+        # Compute marker attributes column-wise; the loop only formats HTML
+        ids = location_summary['ID'].to_numpy()
+        names = location_summary['Name'].to_numpy()
+        lats = location_summary['LAT'].to_numpy(dtype=float)
+        longs = location_summary['LONG'].to_numpy(dtype=float)
+        totals = location_summary['Total Vehicles'].to_numpy(dtype=float)
+        
+        valid = ~(np.isnan(lats) | np.isnan(longs))
+        v_c_ratios = totals / MAP_CONFIG['capacity_assumption']
+        colors = create_color_marker(totals)
+        sizes = get_marker_size(totals)
+        diameters = sizes * 2
+        font_sizes = sizes / 2
+        
+        for i in np.flatnonzero(~valid):
+            logger.warning(f"Skipping location {ids[i]} due to invalid coordinates")
+
+        # The interval is the same for every popup, so fill it in once; braces
+        # are escaped so it stays literal text in the per-marker template
+        popup_template = MARKER_POPUP_HTML.replace(
+            '{time_interval}',
+            str(time_interval).replace('{', '{{').replace('}', '}}')
+        )
+        
+        # Build one GeoJSON feature per location; icons are kept apart and
+        # looked up by location ID when the layer is styled
+        features = []
+        icons = {}
+        for i in np.flatnonzero(valid):
+            location_id = str(ids[i])
+            total_vehicles = int(totals[i])
+            
+            icons[location_id] = MARKER_ICON_HTML.format(
+                diameter=diameters[i],
+                color=colors[i],
+                font_size=font_sizes[i],
+                label=f"{total_vehicles:,}"
+            )
+            features.append({
+                'type': 'Feature',
+                'id': location_id,
+                'geometry': {
+                    'type': 'Point',
+                    'coordinates': [float(longs[i]), float(lats[i])]
+                },
+                'properties': {
+                    'popup': popup_template.format(
+                        name=names[i],
+                        total=total_vehicles,
+                        v_c_ratio=v_c_ratios[i]
+                    )
+                }
+            })
+        
+        return {
+            'center': [float(mean_lat), float(mean_long)],
+            'features': features,
+            'icons': icons,
+            'summary': location_summary
+        }
+        
+    except Exception as e:
+        logger.error(f"Error preparing map data: {str(e)}")
+        return None
+
+def draw_base_map(map_data):
+    """
+    Create the traffic volume map from prepare_map_data's result
+    """
+    try:
         m = folium.Map(
-            location=[mean_lat, mean_long],
+            location=map_data['center'],
             zoom_start=MAP_CONFIG['zoom_start'],
             tiles=MAP_CONFIG['tile_style']
         )
-
-        # Add markers
-        for _, row in location_summary.iterrows():
-            if pd.isna(row['LAT']) or pd.isna(row['LONG']):
-                logger.warning(f"Skipping location {row['ID']} due to invalid coordinates")
-                continue
-                
-            total_vehicles = row['Total Vehicles']
-            v_c_ratio = total_vehicles / MAP_CONFIG['capacity_assumption']
-            is_selected = (selected_location == row['ID'])
-            
-            color = create_color_marker(total_vehicles)
-            size = np.log(total_vehicles + 1) * 3
-            
-            popup_content = f"""
-            <div style='width: 220px;'>
-                <h4 style="margin:5px 0;">{row['Name']}</h4>
-                <b>Total Vehicles:</b> {int(total_vehicles):,}<br>
-                <b>Time:</b> {time_interval}<br>
-                <b>Volume/Capacity (v/c):</b> {v_c_ratio:.2f}
-            </div>
-            """
-
-            icon_html = f"""
-                <div style="
-                    width: {size*2}px;
-                    height: {size*2}px;
-                    background-color: {color};
-                    border-radius: 50%;
-                    opacity: 0.7;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    color: #fff;
-                    font-weight: bold;
-                    font-size: {size/2}px;
-                    border: 2px solid {'#000' if is_selected else 'transparent'};
-                ">
-                    {int(total_vehicles):,}
-                </div>
-            """
-
-            folium.Marker(
-                location=[row['LAT'], row['LONG']],
-                popup=popup_content,
-                icon=folium.DivIcon(html=icon_html)
+        
+        # Add all markers as one GeoJSON layer rather than one Leaflet marker
+        # statement each; icons are looked up by location ID when styled
+        icons = map_data['icons']
+        if map_data['features']:
+            folium.GeoJson(
+                {'type': 'FeatureCollection', 'features': map_data['features']},
+                name="Traffic volume",
+                marker=folium.Marker(icon=folium.DivIcon()),
+                # className matches the 'empty' class folium gives standalone DivIcons
+                style_function=lambda feature: {
+                    'html': icons[feature['id']],
+                    'className': 'empty'
+                },
+                popup=folium.GeoJsonPopup(fields=['popup'], labels=False)
             ).add_to(m)
         
         return m
         
     except Exception as e:
         logger.error(f"Error creating map: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+def create_base_map(data, time_interval, selected_date, project_id=None):
+    """
+    Create the traffic volume map for a date, interval and project.
+    Returns the map and its per-location summary, or (None, None).
+    The selected location is drawn separately by create_selection_layer.
+    """
+    map_data = prepare_map_data(data, time_interval, selected_date, project_id)
+    if map_data is None:
+        return None, None
+    return draw_base_map(map_data), map_data['summary']
+
+def create_selection_layer(location_summary, selected_location):
+    """
+    Create a layer outlining the selected location's marker
+    """
+    layer = folium.FeatureGroup(name="Selected location")
+    if location_summary is None:
+        return layer
+    
+    selected = location_summary[
+        (location_summary['ID'] == selected_location)
+        & location_summary['LAT'].notna()
+        & location_summary['LONG'].notna()
+    ]
+    for lat, lng, total_vehicles in zip(selected['LAT'], selected['LONG'], selected['Total Vehicles']):
+        outline_html = MARKER_OUTLINE_HTML.format(
+            diameter=get_marker_size(total_vehicles) * 2
+        )
+        
+        # Non-interactive so clicks still reach the volume marker underneath
+        folium.Marker(
+            location=[lat, lng],
+            icon=folium.DivIcon(html=outline_html),
+            interactive=False,
+            z_index_offset=1000
+        ).add_to(layer)
+    
+    return layer
+
+def create_map(data, time_interval, selected_date, selected_location=None, project_id=None):
+    """
+    Create an interactive map with traffic volume markers
+    """
+    m, location_summary = create_base_map(data, time_interval, selected_date, project_id)
+    if m is not None and selected_location is not None:
+        create_selection_layer(location_summary, selected_location).add_to(m)
+    return m
\ No newline at end of file
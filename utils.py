@@ -1,37 +1,59 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import os
-import numpy as np
 from datetime import datetime
 import logging
+import weakref
 from config import (
     APP_CONFIG,
-    COLUMN_MAPPINGS,
+    COLUMN_DTYPES,
     DATA_CONFIG, 
-    REQUIRED_COLUMNS
+    LOADED_COLUMNS,
+    NORMALIZED_COLUMN_MAPPINGS,
+    REQUIRED_COLUMNS,
+    VEHICLE_COLUMNS
 )
 
 logger = logging.getLogger(__name__)
 
+# Data derived per frame (row indexes, location metadata), dropped when the
+# frame is collected
+_FRAME_CACHE = {}
+
+def normalize_column_names(columns):
+    """
+    Lower-case column names and treat hyphens as spaces, the form used as
+    keys of NORMALIZED_COLUMN_MAPPINGS
+    """
+    return pd.Index(columns).str.lower().str.replace('-', ' ').str.strip()
+
+def get_csv_read_options(header):
+    """
+    Choose the CSV columns the dashboard uses, matching headers the same
+    way standardize_column_names does, and the types to read them as.
+    Labels and dates are read as text so values like Direction ID '1.10'
+    keep their spelling; everything else is cast by apply_column_dtypes.
+    """
+    usecols = []
+    column_types = {}
+    for col, normalized in zip(header, normalize_column_names(header)):
+        mapped = NORMALIZED_COLUMN_MAPPINGS.get(normalized)
+        if mapped in LOADED_COLUMNS:
+            usecols.append(col)
+            if mapped == 'Date' or COLUMN_DTYPES.get(mapped) == 'category':
+                column_types[col] = pa.string()
+    return usecols, column_types
+
 def standardize_column_names(df):
     """
     Standardize column names across different file formats
     """
-    # Convert column names to lowercase and replace hyphens with spaces
-    df.columns = df.columns.str.lower().str.replace('-', ' ')
-    
-    # Create mapping dictionary
-    mapping = {}
-    for col in df.columns:
-        col_lower = col.lower().replace('-', ' ')
-        # Check for direct matches first
-        if col_lower in [k.lower().replace('-', ' ') for k in COLUMN_MAPPINGS.keys()]:
-            for original, mapped in COLUMN_MAPPINGS.items():
-                if col_lower == original.lower().replace('-', ' '):
-                    mapping[col] = mapped
-                    break
-    
-    # Apply the mapping and remove any duplicate columns
-    df = df.rename(columns=mapping)
+    # Normalize names (lower case, hyphens as spaces) and map them in one pass
+    normalized = normalize_column_names(df.columns)
+    df.columns = [NORMALIZED_COLUMN_MAPPINGS.get(col, col) for col in normalized]
+    
+    # Remove any duplicate columns
     df = df.loc[:, ~df.columns.duplicated()]
     
     logger.info(f"Standardized columns: {df.columns.tolist()}")
@@ -56,6 +78,110 @@ def validate_dataframe(df):
     
     return True, ""
 
+def apply_column_dtypes(df):
+    """
+    Cast standardized columns to the types in COLUMN_DTYPES
+    """
+    return df.astype({col: dtype for col, dtype in COLUMN_DTYPES.items() if col in df.columns})
+
+def get_cache_paths(file_path):
+    """
+    Return the parquet sidecar and stamp file paths for a CSV file
+    """
+    cache_path = f"{file_path}{DATA_CONFIG['cache_suffix']}"
+    return cache_path, f"{cache_path}.stamp"
+
+def get_file_stamp(file_path):
+    """
+    Identify the current version of a file by its modification time and size
+    """
+    stat = os.stat(file_path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+def get_cache_stamp(file_path):
+    """
+    Identify the cache contents expected for the current file and loader version
+    """
+    return f"v{DATA_CONFIG['cache_version']}:{get_file_stamp(file_path)}"
+
+def read_cached_data(file_path):
+    """
+    Read the standardized parquet sidecar of a CSV file if it is still fresh
+    """
+    cache_path, stamp_path = get_cache_paths(file_path)
+    try:
+        with open(stamp_path) as f:
+            if f.read().strip() != get_cache_stamp(file_path):
+                return None
+        # Parquet does not keep every pandas type (e.g. categories of
+        # numbers), so restore the schema a fresh load produces
+        df = apply_column_dtypes(pd.read_parquet(cache_path))
+        logger.info(f"Loaded cached data from {cache_path}")
+        return df
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache {cache_path}: {str(e)}")
+        return None
+
+def write_cached_data(df, file_path, stamp):
+    """
+    Persist a standardized DataFrame as a parquet sidecar of its CSV file
+    """
+    cache_path, stamp_path = get_cache_paths(file_path)
+    try:
+        df.to_parquet(
+            cache_path,
+            compression=DATA_CONFIG['cache_compression'],
+            index=False
+        )
+        with open(stamp_path, 'w') as f:
+            f.write(stamp)
+        logger.info(f"Cached standardized data to {cache_path}")
+    except Exception as e:
+        # A read-only deployment still works, it just parses the CSV every time
+        logger.warning(f"Could not write cache {cache_path}: {str(e)}")
+
+def read_csv_data(file_path):
+    """
+    Parse, standardize and validate a traffic count CSV file
+    """
+    # Read with pyarrow's multi-threaded parser directly; unlike pandas'
+    # pyarrow engine it applies column types while parsing, not after
+    # inferring them
+    header = pd.read_csv(file_path, nrows=0).columns
+    usecols, column_types = get_csv_read_options(header)
+    df = pa_csv.read_csv(
+        file_path,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols,
+            column_types=column_types,
+            strings_can_be_null=True
+        )
+    ).to_pandas()
+    
+    df = standardize_column_names(df)
+    
+    is_valid, error_msg = validate_dataframe(df)
+    if not is_valid:
+        raise ValueError(error_msg)
+    
+    try:
+        # Kept as datetime64 so date filters compare integers, not Python objects
+        df['Date'] = pd.to_datetime(
+            df['Date'], format=DATA_CONFIG['csv_date_format'], cache=True
+        )
+    except Exception as e:
+        logger.error(f"Error processing dates: {e}")
+        raise ValueError(f"Date conversion failed: {str(e)}")
+    
+    # Blank counts are counted as zero so the columns fit plain int32,
+    # which sums without a mask
+    count_columns = [col for col in VEHICLE_COLUMNS + ['Total Vehicles'] if col in df.columns]
+    df[count_columns] = df[count_columns].fillna(0)
+    
+    return apply_column_dtypes(df)
+
 def load_data(file_path):
     """
     Load and prepare traffic count data
@@ -63,28 +189,19 @@ def load_data(file_path):
     logger.info(f"Loading data from {file_path}")
     
     try:
-        chunks = []
-        for chunk in pd.read_csv(file_path, chunksize=DATA_CONFIG['chunk_size']):
-            chunks.append(chunk)
-        df = pd.concat(chunks, ignore_index=True)
-        
-        df = standardize_column_names(df)
-        
-        is_valid, error_msg = validate_dataframe(df)
-        if not is_valid:
-            raise ValueError(error_msg)
+        df = read_cached_data(file_path)
+        if df is None:
+            stamp = get_cache_stamp(file_path)
+            df = read_csv_data(file_path)
+            write_cached_data(df, file_path, stamp)
         
-        try:
-            df['Date'] = pd.to_datetime(df['Date']).dt.date
-        except Exception as e:
-            logger.error(f"Error processing dates: {e}")
-            raise ValueError(f"Date conversion failed: {str(e)}")
-        
-        # Set image paths for local files - removing any existing 'loc' prefix
+        # Set image paths for local files - removing any existing 'loc' prefix.
+        # Paths are built once per location and mapped back onto the rows
         if 'ID' in df.columns:
-            df['Direct_Image_URL'] = df['ID'].apply(lambda x: 
-                os.path.join(APP_CONFIG['images_path'], 
-                           f'loc{str(x).lower().replace("loc", "")}.png'))
+            location_ids = pd.Series(df['ID'].unique())
+            location_numbers = location_ids.astype(str).str.lower().str.replace('loc', '', regex=False)
+            image_paths = os.path.join(APP_CONFIG['images_path'], 'loc') + location_numbers + '.png'
+            df['Direct_Image_URL'] = df['ID'].map(dict(zip(location_ids, image_paths)))
             logger.info(f"Added image paths. Sample path: {df['Direct_Image_URL'].iloc[0]}")
         
         return df
@@ -93,22 +210,75 @@ def load_data(file_path):
         logger.error(f"Error loading data: {str(e)}")
         raise
 
+def get_frame_cache(df):
+    """
+    Return the dict of derived data cached for this frame
+    """
+    frame_cache = _FRAME_CACHE.get(id(df))
+    if frame_cache is None:
+        frame_cache = _FRAME_CACHE[id(df)] = {}
+        weakref.finalize(df, _FRAME_CACHE.pop, id(df), None)
+    return frame_cache
+
+def get_rows(df, filters, columns=None):
+    """
+    Return the rows of df whose columns equal the given values, e.g.
+    {'ID': 'Loc1', 'Time Interval': '09:00 - 10:00'}, optionally limited
+    to the given columns. The first call per set of filter columns groups
+    the frame once; later calls are dict lookups.
+    """
+    fields = tuple(filters)
+    frame_cache = get_frame_cache(df)
+    
+    groups = frame_cache.get(fields)
+    if groups is None:
+        groups = df.groupby(list(fields), observed=True, sort=False).indices
+        frame_cache[fields] = groups
+    
+    key = tuple(filters.values()) if len(fields) > 1 else filters[fields[0]]
+    positions = groups.get(key)
+    if positions is None:
+        positions = slice(0, 0)
+    if columns is None:
+        return df.iloc[positions]
+    # Select rows and columns in one step so unused columns are never copied;
+    # get_indexer marks unknown names with -1, which iloc would accept
+    column_positions = df.columns.get_indexer(columns)
+    if (column_positions < 0).any():
+        missing = [col for col, pos in zip(columns, column_positions) if pos < 0]
+        raise KeyError(f"Columns not found: {missing}")
+    return df.iloc[positions, column_positions]
+
+def get_location_meta(df):
+    """
+    Return the name and coordinates of each location, indexed by ID
+    """
+    frame_cache = get_frame_cache(df)
+    if 'location_meta' not in frame_cache:
+        frame_cache['location_meta'] = (
+            df.drop_duplicates('ID').set_index('ID')[['Name', 'LONG', 'LAT']]
+        )
+    return frame_cache['location_meta']
+
 def calculate_intersection_stats(df, location_id, time_interval, project_id=None):
     """
     Calculate traffic statistics for a specific intersection
     """
-    filters = [
-        (df['ID'] == location_id),
-        (df['Time Interval'] == time_interval)
-    ]
+    filters = {'ID': location_id, 'Time Interval': time_interval}
     
     if project_id:
-        filters.append(df['Project ID'] == project_id)
+        filters['Project ID'] = project_id
+    
+    # Only copy the columns the statistics use
+    key_columns = ['ID', 'Time Interval', 'Direction ID']
+    available_columns = [col for col in VEHICLE_COLUMNS if col in df.columns]
+    columns = key_columns + [
+        col for col in ['Total Vehicles', 'Direct_Image_URL'] + available_columns
+        if col in df.columns
+    ]
         
     # Drop duplicates before processing
-    location_data = df[np.all(filters, axis=0)].drop_duplicates(
-        subset=['ID', 'Time Interval', 'Direction ID']
-    )
+    location_data = get_rows(df, filters, columns).drop_duplicates(subset=key_columns)
     
     if location_data.empty:
         logger.warning(f"No data found for location {location_id}")
@@ -119,30 +289,18 @@ def calculate_intersection_stats(df, location_id, time_interval, project_id=None
             'image_url': None
         }
     
-    vehicle_columns = [
-        'Car', 'Microbus', 'Bus', 'Truck',
-        'Special vehicular', 'Motorcycle', 'Bicycle'
-    ]
-    
     # Simplified image URL handling
     image_url = (location_data['Direct_Image_URL'].iloc[0] 
                 if 'Direct_Image_URL' in location_data.columns 
                 and not location_data.empty 
                 else None)
     
-    available_columns = [col for col in vehicle_columns if col in location_data.columns]
-    total_vehicles = location_data['Total Vehicles'].sum()
-    
-    vehicle_composition = {
-        col: location_data[col].sum()
-        for col in available_columns
-    }
+    # Sum the total and every vehicle column in a single reduction
+    sums = location_data[['Total Vehicles'] + available_columns].sum()
+    total_vehicles = sums.pop('Total Vehicles')
+    vehicle_composition = sums.to_dict()
     
-    percentages = {
-        vehicle: (count / total_vehicles * 100)
-        for vehicle, count in vehicle_composition.items()
-        if total_vehicles > 0
-    }
+    percentages = (sums / total_vehicles * 100).to_dict() if total_vehicles > 0 else {}
     
     return {
         'total_vehicles': total_vehicles,